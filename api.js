@@ -4,6 +4,8 @@
  */
 
 const API_BASE_URL = 'http://localhost:5000/api';
+const ANALYSIS_POLL_INTERVAL_MS = 1000;
+const ANALYSIS_POLL_MAX_ATTEMPTS = 300;
 
 // Get authentication token from localStorage
 function getAuthToken() {
@@ -142,11 +144,25 @@ const voiceAPI = {
   },
   
   async analyzeFile(fileId) {
-    const data = await apiRequest(`/voice/analyze/${fileId}`, {
+    // Analysis runs in the background; poll until the job finishes
+    await apiRequest(`/voice/analyze/${fileId}`, {
       method: 'POST',
     });
     
-    return data;
+    for (let attempt = 0; attempt < ANALYSIS_POLL_MAX_ATTEMPTS; attempt++) {
+      const data = await apiRequest(`/voice/analyze/${fileId}/status`);
+      
+      if (data.status === 'completed') {
+        return data;
+      }
+      if (data.status === 'failed') {
+        throw new Error(data.error || 'Analysis failed');
+      }
+      
+      await new Promise((resolve) => setTimeout(resolve, ANALYSIS_POLL_INTERVAL_MS));
+    }
+    
+    throw new Error('Analysis is taking too long. Please check your history later.');
   },
   
   async getHistory() {
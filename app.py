@@ -1,39 +1,117 @@
-from flask import Flask, request, jsonify, send_from_directory
+from flask import Flask, Response, request, jsonify, stream_with_context
+from flask.json.provider import JSONProvider
 from flask_cors import CORS
 import os
 import sqlite3
-from datetime import datetime
+import json
+import hashlib
+import threading
+import time
 from werkzeug.security import generate_password_hash, check_password_hash
-from werkzeug.utils import secure_filename
 import jwt
-from functools import wraps
+import orjson
+from functools import wraps, cached_property
+from concurrent.futures import ThreadPoolExecutor
 import uuid
+from cachetools import TLRUCache
+from whitenoise import WhiteNoise
 
 from voice_importer import VoiceImporter
-from voice_detector import VoiceDetector
+from database_utils import (
+    get_db, close_db,
+    SQL_GET_USER_CREDENTIALS, SQL_INSERT_USER,
+    SQL_GET_AUDIO_FILE_PATH, SQL_INSERT_ANALYSIS_RESULT, SQL_GET_ANALYSIS_SUMMARY,
+    SQL_INSERT_ANALYSIS_JOB, SQL_UPDATE_ANALYSIS_JOB, SQL_GET_LATEST_ANALYSIS_JOB,
+    SQL_FAIL_UNFINISHED_ANALYSIS_JOBS,
+    SQL_GET_HISTORY, SQL_LIST_USER_FILES
+)
 from config import config as app_config
 
-app = Flask(__name__, static_folder='.')
+# JSON responses are encoded with orjson (numpy scalars/arrays from the detector included)
+ORJSON_OPTIONS = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+
+class ORJSONProvider(JSONProvider):
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj, option=ORJSON_OPTIONS).decode()
+    
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+    
+    def response(self, *args, **kwargs):
+        # Hand orjson's bytes straight to the response, skipping the str round trip
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(orjson.dumps(obj, option=ORJSON_OPTIONS), mimetype='application/json')
+
+# No built-in static route: WhiteNoise's explicit file list below is the only static surface
+app = Flask(__name__, static_folder=None)
+app.json = ORJSONProvider(app)
 CORS(app)
 
 # Load configuration (defaults to development, override with FLASK_ENV in production)
 env = os.environ.get('FLASK_ENV', 'development')
 cfg_class = app_config.get(env, app_config['default'])
 app.config.from_object(cfg_class)
+app.teardown_appcontext(close_db)
+
+# Settings read on every upload/analysis; fixed for the life of the process
+UPLOAD_FOLDER = app.config['UPLOAD_FOLDER']
+ALLOWED_EXTENSIONS = app.config['ALLOWED_EXTENSIONS']
 
 # Ensure upload directory exists
-os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
+os.makedirs(UPLOAD_FOLDER, exist_ok=True)
 os.makedirs('database', exist_ok=True)
 
 # Initialize modules
-voice_importer = VoiceImporter(app.config['UPLOAD_FOLDER'])
-voice_detector = VoiceDetector()
+voice_importer = VoiceImporter(UPLOAD_FOLDER)
+
+class LazyVoiceDetector:
+    """Imports and builds the VoiceDetector on a background thread so worker boot is not blocked"""
+    
+    def __init__(self):
+        self._detector = None
+        self._error = None
+        self._ready = threading.Event()
+        threading.Thread(target=self._load, name='voice-detector-loader', daemon=True).start()
+    
+    def _load(self):
+        try:
+            from voice_detector import VoiceDetector, preload
+            preload()
+            self._detector = VoiceDetector()
+        except Exception as e:
+            self._error = e
+        finally:
+            self._ready.set()
+    
+    @cached_property
+    def detector(self):
+        # Blocks only if the first analysis arrives before loading finished
+        self._ready.wait()
+        if self._error is not None:
+            raise self._error
+        return self._detector
+    
+    def detect_ai_voice(self, audio_path):
+        return self.detector.detect_ai_voice(audio_path)
+
+voice_detector = LazyVoiceDetector()
+
+# Voice analysis runs off the request thread; clients poll the job status endpoint
+analysis_executor = ThreadPoolExecutor(
+    max_workers=app.config['ANALYSIS_WORKERS'],
+    thread_name_prefix='voice-analysis'
+)
 
 # Database initialization
 def init_db():
     conn = sqlite3.connect('database/voiceshield.db')
     cursor = conn.cursor()
     
+    # Storage layout (only takes effect when the database is first created)
+    cursor.execute('PRAGMA page_size = 8192')
+    cursor.execute('PRAGMA auto_vacuum = INCREMENTAL')
+    cursor.execute('PRAGMA journal_mode = WAL')
+    
     # Users table
     cursor.execute('''
         CREATE TABLE IF NOT EXISTS users (
@@ -53,18 +131,24 @@ def init_db():
             original_filename TEXT NOT NULL,
             file_path TEXT NOT NULL,
             file_size INTEGER,
+            content_hash TEXT,
             uploaded_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
             FOREIGN KEY (user_id) REFERENCES users(id)
         )
     ''')
     
+    # content_hash was added after the first release; add it to existing databases
+    columns = {row[1] for row in cursor.execute('PRAGMA table_info(audio_files)')}
+    if 'content_hash' not in columns:
+        cursor.execute('ALTER TABLE audio_files ADD COLUMN content_hash TEXT')
+    
     # Analysis results table
     cursor.execute('''
         CREATE TABLE IF NOT EXISTS analysis_results (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
             audio_file_id INTEGER NOT NULL,
             user_id INTEGER NOT NULL,
-            is_ai_generated REAL NOT NULL,
+            is_ai_generated INTEGER NOT NULL,
             confidence_score REAL NOT NULL,
             scam_patterns TEXT,
             analysis_details TEXT,
@@ -74,28 +158,71 @@ def init_db():
         )
     ''')
     
+    # Background analysis jobs
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS analysis_jobs (
+            id TEXT PRIMARY KEY,
+            audio_file_id INTEGER NOT NULL,
+            user_id INTEGER NOT NULL,
+            status TEXT NOT NULL DEFAULT 'queued',
+            result_id INTEGER,
+            error TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (audio_file_id) REFERENCES audio_files(id),
+            FOREIGN KEY (user_id) REFERENCES users(id),
+            FOREIGN KEY (result_id) REFERENCES analysis_results(id)
+        )
+    ''')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_analysis_jobs_file ON analysis_jobs(audio_file_id, user_id)')
+    
+    # The job queue lives in memory, so jobs left unfinished by a previous run will never complete
+    cursor.execute(SQL_FAIL_UNFINISHED_ANALYSIS_JOBS, ('Interrupted by a server restart',))
+    
     conn.commit()
     conn.close()
 
 init_db()
 
+# Verified token payloads keyed by SHA256 of the token; an entry never outlives the token's own exp
+_token_cache = TLRUCache(
+    maxsize=app.config['TOKEN_CACHE_SIZE'],
+    ttu=lambda _key, payload, now: min(now + app.config['TOKEN_CACHE_TTL'], payload.get('exp', 0)),
+    timer=time.time
+)
+_token_cache_lock = threading.Lock()
+
 # JWT token helper functions
+_jwt = jwt.PyJWT()
+JWT_ALGORITHM = 'HS256'
+JWT_ALGORITHMS = [JWT_ALGORITHM]
+
 def generate_token(user_id, email):
     payload = {
         'user_id': user_id,
         'email': email,
-        'exp': datetime.utcnow().timestamp() + 86400  # 24 hours
+        'exp': int(time.time()) + app.config['JWT_EXPIRATION_SECONDS']
     }
-    return jwt.encode(payload, app.config['SECRET_KEY'], algorithm='HS256')
+    return _jwt.encode(payload, app.config['SECRET_KEY'], algorithm=JWT_ALGORITHM)
 
 def verify_token(token):
-    try:
-        payload = jwt.decode(token, app.config['SECRET_KEY'], algorithms=['HS256'])
+    key = hashlib.sha256(token.encode()).digest()
+    with _token_cache_lock:
+        payload = _token_cache.get(key)
+    if payload is not None:
         return payload
+    
+    try:
+        payload = _jwt.decode(token, app.config['SECRET_KEY'], algorithms=JWT_ALGORITHMS)
     except jwt.ExpiredSignatureError:
         return None
     except jwt.InvalidTokenError:
         return None
+    
+    # Only successfully verified tokens are cached
+    with _token_cache_lock:
+        _token_cache[key] = payload
+    return payload
 
 # Authentication decorator
 def token_required(f):
@@ -124,37 +251,42 @@ def token_required(f):
 
 # Helper function to check file extension
 def allowed_file(filename):
-    return '.' in filename and filename.rsplit('.', 1)[1].lower() in app.config['ALLOWED_EXTENSIONS']
+    _, dot, ext = filename.rpartition('.')
+    return bool(dot) and ext.lower() in ALLOWED_EXTENSIONS
+
+# Helper function to decode JSON columns (older rows may hold non-JSON text, returned unchanged)
+def load_json_field(value, default=None):
+    if value is None:
+        return default
+    try:
+        return json.loads(value)
+    except ValueError:
+        return value
 
 # Authentication Routes
 @app.route('/api/auth/signup', methods=['POST'])
 def signup():
     try:
-        data = request.get_json()
+        data = request.get_json(silent=True, cache=False) or {}
         email = data.get('email')
         password = data.get('password')
         
         if not email or not password:
             return jsonify({'error': 'Email and password are required'}), 400
         
-        conn = sqlite3.connect('database/voiceshield.db')
+        conn = get_db()
         cursor = conn.cursor()
         
-        # Check if user already exists
-        cursor.execute('SELECT id FROM users WHERE email = ?', (email,))
-        if cursor.fetchone():
-            conn.close()
+        # Create new user; no row comes back if the email is already taken
+        hashed_password = generate_password_hash(password, method=app.config['PASSWORD_HASH_METHOD'])
+        cursor.execute(SQL_INSERT_USER, (email, hashed_password))
+        row = cursor.fetchone()
+        conn.commit()
+        
+        if not row:
             return jsonify({'error': 'User already exists'}), 400
         
-        # Create new user
-        hashed_password = generate_password_hash(password)
-        cursor.execute(
-            'INSERT INTO users (email, password) VALUES (?, ?)',
-            (email, hashed_password)
-        )
-        user_id = cursor.lastrowid
-        conn.commit()
-        conn.close()
+        user_id = row[0]
         
         token = generate_token(user_id, email)
         return jsonify({
@@ -169,18 +301,17 @@ def signup():
 @app.route('/api/auth/login', methods=['POST'])
 def login():
     try:
-        data = request.get_json()
+        data = request.get_json(silent=True, cache=False) or {}
         email = data.get('email')
         password = data.get('password')
         
         if not email or not password:
             return jsonify({'error': 'Email and password are required'}), 400
         
-        conn = sqlite3.connect('database/voiceshield.db')
+        conn = get_db()
         cursor = conn.cursor()
-        cursor.execute('SELECT id, email, password FROM users WHERE email = ?', (email,))
+        cursor.execute(SQL_GET_USER_CREDENTIALS, (email,))
         user = cursor.fetchone()
-        conn.close()
         
         if not user:
             return jsonify({'error': 'Invalid credentials'}), 401
@@ -229,99 +360,164 @@ def upload_voice():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/voice/upload/batch', methods=['POST'])
+@token_required
+def upload_voice_batch():
+    try:
+        files = [file for file in request.files.getlist('files') if file.filename != '']
+        if not files:
+            return jsonify({'error': 'No files provided'}), 400
+        
+        invalid = [file.filename for file in files if not allowed_file(file.filename)]
+        if invalid:
+            return jsonify({
+                'error': 'Invalid file type. Allowed: MP3, WAV, M4A, OGG, FLAC',
+                'files': invalid
+            }), 400
+        
+        # Save files using voice importer (one database transaction for the whole batch)
+        result = voice_importer.import_audio_batch(files, request.user_id)
+        
+        if result['success']:
+            return jsonify({
+                'message': f"{len(result['files'])} files uploaded successfully",
+                'files': [
+                    {'file_id': f['file_id'], 'filename': f['filename'], 'original_filename': f['original_filename']}
+                    for f in result['files']
+                ],
+                'errors': result['errors']
+            }), 201
+        else:
+            return jsonify({'error': result.get('error', 'Upload failed'), 'errors': result.get('errors', [])}), 400
+    
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+# Background analysis job (runs on analysis_executor)
+def run_analysis_job(job_id, file_id, user_id, full_path):
+    with app.app_context():
+        conn = get_db()
+        
+        try:
+            conn.execute(SQL_UPDATE_ANALYSIS_JOB, ('running', None, None, job_id))
+            conn.commit()
+            
+            analysis_result = voice_detector.detect_ai_voice(full_path)
+            
+            # Save analysis results
+            cursor = conn.cursor()
+            cursor.execute(SQL_INSERT_ANALYSIS_RESULT, (
+                file_id,
+                user_id,
+                1 if analysis_result['is_ai_generated'] else 0,
+                analysis_result['confidence'],
+                json.dumps(analysis_result.get('scam_patterns', []), separators=(',', ':')),
+                json.dumps(analysis_result.get('details', {}), separators=(',', ':'))
+            ))
+            cursor.execute(SQL_UPDATE_ANALYSIS_JOB, ('completed', cursor.lastrowid, None, job_id))
+            conn.commit()
+        
+        except Exception as e:
+            conn.rollback()
+            try:
+                conn.execute(SQL_UPDATE_ANALYSIS_JOB, ('failed', None, str(e), job_id))
+                conn.commit()
+            except Exception as update_error:
+                # Nobody reads the job's Future, so at least leave a trace
+                print(f"Could not mark analysis job {job_id} as failed: {update_error}")
+
 @app.route('/api/voice/analyze/<int:file_id>', methods=['POST'])
 @token_required
 def analyze_voice(file_id):
     try:
-        conn = sqlite3.connect('database/voiceshield.db')
+        conn = get_db()
         cursor = conn.cursor()
         
         # Get audio file
-        cursor.execute(
-            'SELECT id, file_path, user_id FROM audio_files WHERE id = ? AND user_id = ?',
-            (file_id, request.user_id)
-        )
+        cursor.execute(SQL_GET_AUDIO_FILE_PATH, (file_id, request.user_id))
         audio_file = cursor.fetchone()
         
         if not audio_file:
-            conn.close()
             return jsonify({'error': 'Audio file not found'}), 404
         
         file_path = audio_file[1]
-        full_path = os.path.join(app.config['UPLOAD_FOLDER'], file_path)
+        full_path = os.path.join(UPLOAD_FOLDER, file_path)
         
         if not os.path.exists(full_path):
-            conn.close()
             return jsonify({'error': 'File not found on server'}), 404
         
-        # Analyze voice using voice detector
-        analysis_result = voice_detector.detect_ai_voice(full_path)
-        
-        # Save analysis results
-        cursor.execute('''
-            INSERT INTO analysis_results 
-            (audio_file_id, user_id, is_ai_generated, confidence_score, scam_patterns, analysis_details)
-            VALUES (?, ?, ?, ?, ?, ?)
-        ''', (
-            file_id,
-            request.user_id,
-            analysis_result['is_ai_generated'],
-            analysis_result['confidence'],
-            str(analysis_result.get('scam_patterns', [])),
-            str(analysis_result.get('details', {}))
-        ))
-        
-        result_id = cursor.lastrowid
+        # Queue the analysis; the job row must be committed before a worker can update it
+        job_id = uuid.uuid4().hex
+        cursor.execute(SQL_INSERT_ANALYSIS_JOB, (job_id, file_id, request.user_id))
         conn.commit()
-        conn.close()
+        analysis_executor.submit(run_analysis_job, job_id, file_id, request.user_id, full_path)
         
         return jsonify({
-            'message': 'Analysis completed',
-            'result_id': result_id,
-            'analysis': analysis_result
-        }), 200
+            'message': 'Analysis queued',
+            'job_id': job_id,
+            'status': 'queued'
+        }), 202
     
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/voice/analyze/<int:file_id>/status', methods=['GET'])
+@token_required
+def analysis_status(file_id):
+    try:
+        conn = get_db()
+        cursor = conn.cursor()
+        
+        # Latest job for this file
+        cursor.execute(SQL_GET_LATEST_ANALYSIS_JOB, (file_id, request.user_id))
+        job = cursor.fetchone()
+        
+        if not job:
+            return jsonify({'error': 'No analysis found for this file'}), 404
+        
+        job_id, status, result_id, error = job
+        response = {'job_id': job_id, 'status': status}
+        
+        if status == 'completed':
+            cursor.execute(SQL_GET_ANALYSIS_SUMMARY, (result_id,))
+            row = cursor.fetchone()
+            response['message'] = 'Analysis completed'
+            response['result_id'] = result_id
+            response['analysis'] = {
+                'is_ai_generated': bool(row[0]),
+                'confidence': row[1],
+                'scam_patterns': load_json_field(row[2], []),
+                'details': load_json_field(row[3], {})
+            }
+        elif status == 'failed':
+            response['error'] = error
+        
+        return jsonify(response), 200
+    
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+# Stream history rows straight from the cursor as a JSON document
+def _gen_history(cursor):
+    yield b'{"history":['
+    for i, row in enumerate(cursor):
+        entry = dict(row)
+        entry['is_ai_generated'] = bool(entry['is_ai_generated'])
+        entry['scam_patterns'] = load_json_field(entry['scam_patterns'], [])
+        yield (b',' if i else b'') + orjson.dumps(entry, option=ORJSON_OPTIONS)
+    yield b']}'
+
 @app.route('/api/voice/history', methods=['GET'])
 @token_required
 def get_history():
     try:
-        conn = sqlite3.connect('database/voiceshield.db')
+        conn = get_db()
         cursor = conn.cursor()
+        cursor.row_factory = sqlite3.Row
         
-        cursor.execute('''
-            SELECT 
-                ar.id,
-                af.original_filename,
-                af.uploaded_at,
-                ar.is_ai_generated,
-                ar.confidence_score,
-                ar.scam_patterns,
-                ar.analyzed_at
-            FROM analysis_results ar
-            JOIN audio_files af ON ar.audio_file_id = af.id
-            WHERE ar.user_id = ?
-            ORDER BY ar.analyzed_at DESC
-        ''', (request.user_id,))
-        
-        results = cursor.fetchall()
-        conn.close()
-        
-        history = []
-        for row in results:
-            history.append({
-                'id': row[0],
-                'filename': row[1],
-                'uploaded_at': row[2],
-                'is_ai_generated': bool(row[3]),
-                'confidence_score': row[4],
-                'scam_patterns': row[5],
-                'analyzed_at': row[6]
-            })
+        cursor.execute(SQL_GET_HISTORY, (request.user_id,))
         
-        return jsonify({'history': history}), 200
+        return Response(stream_with_context(_gen_history(cursor)), mimetype='application/json')
     
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -330,18 +526,12 @@ def get_history():
 @token_required
 def get_files():
     try:
-        conn = sqlite3.connect('database/voiceshield.db')
+        conn = get_db()
         cursor = conn.cursor()
         
-        cursor.execute('''
-            SELECT id, original_filename, file_size, uploaded_at
-            FROM audio_files
-            WHERE user_id = ?
-            ORDER BY uploaded_at DESC
-        ''', (request.user_id,))
+        cursor.execute(SQL_LIST_USER_FILES, (request.user_id,))
         
         files = cursor.fetchall()
-        conn.close()
         
         file_list = []
         for file in files:
@@ -357,14 +547,15 @@ def get_files():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-# Serve static files (HTML pages)
-@app.route('/')
-def index():
-    return send_from_directory('.', 'mainpage.html')
+# Serve static files (HTML pages) through WhiteNoise so they never reach Flask.
+# Only frontend assets are registered; the app directory also holds code and the database.
+STATIC_EXTENSIONS = ('.html', '.js', '.css', '.png', '.jpg', '.jpeg', '.svg', '.ico')
 
-@app.route('/<path:filename>')
-def serve_static(filename):
-    return send_from_directory('.', filename)
+app.wsgi_app = WhiteNoise(app.wsgi_app)
+app.wsgi_app.add_file_to_dictionary('/', os.path.join(app.root_path, 'mainpage.html'))
+for static_name in os.listdir(app.root_path):
+    if static_name.endswith(STATIC_EXTENSIONS):
+        app.wsgi_app.add_file_to_dictionary('/' + static_name, os.path.join(app.root_path, static_name))
 
 if __name__ == '__main__':
     port = int(os.environ.get('PORT', 5000))
@@ -8,11 +8,16 @@ class Config:
     SECRET_KEY = os.environ.get('SECRET_KEY') or 'your-secret-key-change-in-production-please'
     UPLOAD_FOLDER = os.environ.get('UPLOAD_FOLDER') or 'uploads'
     MAX_CONTENT_LENGTH = 50 * 1024 * 1024  # 50MB
-    ALLOWED_EXTENSIONS = {'mp3', 'wav', 'm4a', 'ogg', 'flac'}
+    ALLOWED_EXTENSIONS = frozenset({'mp3', 'wav', 'm4a', 'ogg', 'flac'})
     DATABASE_PATH = os.environ.get('DATABASE_PATH') or 'database/voiceshield.db'
     
+    # Password hashing (werkzeug method string; existing hashes stay verifiable whatever this is set to)
+    PASSWORD_HASH_METHOD = os.environ.get('PASSWORD_HASH_METHOD') or 'pbkdf2:sha256:260000'
+    
     # JWT settings
-    JWT_EXPIRATION_HOURS = 24
+    JWT_EXPIRATION_SECONDS = 24 * 3600
+    TOKEN_CACHE_SIZE = 10000  # verified tokens kept in memory
+    TOKEN_CACHE_TTL = 30  # seconds a verified token is trusted without re-checking its signature
     
     # Audio processing settings
     SAMPLE_RATE = 22050
@@ -21,6 +26,9 @@ class Config:
     
     # AI Detection thresholds
     AI_DETECTION_THRESHOLD = 0.6
+    
+    # Background analysis workers
+    ANALYSIS_WORKERS = int(os.environ.get('ANALYSIS_WORKERS') or os.cpu_count() or 1)
 
 class DevelopmentConfig(Config):
     """Development configuration"""
@@ -4,11 +4,156 @@ Helper functions for database operations
 """
 import sqlite3
 import json
+import queue
 from datetime import datetime
 from contextlib import contextmanager
+from flask import g
 
 
 DB_PATH = 'database/voiceshield.db'
+POOL_SIZE = 8
+MMAP_SIZE = 256 * 1024 * 1024
+
+# Idle connections shared between requests
+_pool = queue.Queue(maxsize=POOL_SIZE)
+
+# SQL statements, defined once so sqlite3's statement cache sees the same text on every call
+SQL_GET_USER_BY_EMAIL = 'SELECT * FROM users WHERE email = ?'
+SQL_GET_USER_BY_ID = 'SELECT * FROM users WHERE id = ?'
+SQL_GET_USER_CREDENTIALS = 'SELECT id, email, password FROM users WHERE email = ?'
+SQL_INSERT_USER = '''
+    INSERT INTO users (email, password) VALUES (?, ?)
+    ON CONFLICT(email) DO NOTHING
+    RETURNING id
+'''
+
+SQL_GET_AUDIO_FILE = 'SELECT * FROM audio_files WHERE id = ? AND user_id = ?'
+SQL_GET_AUDIO_FILE_PATH = 'SELECT id, file_path, user_id FROM audio_files WHERE id = ? AND user_id = ?'
+SQL_GET_USER_AUDIO_FILES = '''
+    SELECT * FROM audio_files 
+    WHERE user_id = ? 
+    ORDER BY uploaded_at DESC 
+    LIMIT ?
+'''
+SQL_LIST_USER_FILES = '''
+    SELECT id, original_filename, file_size, uploaded_at
+    FROM audio_files
+    WHERE user_id = ?
+    ORDER BY uploaded_at DESC
+'''
+
+SQL_GET_ANALYSIS_RESULTS = '''
+    SELECT 
+        ar.*,
+        af.original_filename,
+        af.uploaded_at as file_uploaded_at
+    FROM analysis_results ar
+    JOIN audio_files af ON ar.audio_file_id = af.id
+    WHERE ar.user_id = ?
+    ORDER BY ar.analyzed_at DESC
+    LIMIT ?
+'''
+SQL_GET_ANALYSIS_BY_ID = '''
+    SELECT 
+        ar.*,
+        af.original_filename,
+        af.file_path
+    FROM analysis_results ar
+    JOIN audio_files af ON ar.audio_file_id = af.id
+    WHERE ar.id = ? AND ar.user_id = ?
+'''
+SQL_GET_HISTORY = '''
+    SELECT 
+        ar.id,
+        af.original_filename AS filename,
+        af.uploaded_at,
+        ar.is_ai_generated,
+        ar.confidence_score,
+        ar.scam_patterns,
+        ar.analyzed_at
+    FROM analysis_results ar
+    JOIN audio_files af ON ar.audio_file_id = af.id
+    WHERE ar.user_id = ?
+    ORDER BY ar.analyzed_at DESC
+'''
+SQL_INSERT_ANALYSIS_RESULT = '''
+    INSERT INTO analysis_results 
+    (audio_file_id, user_id, is_ai_generated, confidence_score, scam_patterns, analysis_details)
+    VALUES (?, ?, ?, ?, ?, ?)
+'''
+SQL_GET_ANALYSIS_SUMMARY = '''
+    SELECT is_ai_generated, confidence_score, scam_patterns, analysis_details
+    FROM analysis_results
+    WHERE id = ?
+'''
+SQL_SAVE_ANALYSIS_RESULT = '''
+    INSERT INTO analysis_results 
+    (audio_file_id, user_id, is_ai_generated, confidence_score, 
+     scam_patterns, analysis_details, spectral_features)
+    VALUES (?, ?, ?, ?, ?, ?, ?)
+'''
+
+SQL_INSERT_ANALYSIS_JOB = 'INSERT INTO analysis_jobs (id, audio_file_id, user_id) VALUES (?, ?, ?)'
+SQL_UPDATE_ANALYSIS_JOB = '''
+    UPDATE analysis_jobs
+    SET status = ?, result_id = ?, error = ?, updated_at = CURRENT_TIMESTAMP
+    WHERE id = ?
+'''
+SQL_FAIL_UNFINISHED_ANALYSIS_JOBS = '''
+    UPDATE analysis_jobs
+    SET status = 'failed', error = ?, updated_at = CURRENT_TIMESTAMP
+    WHERE status IN ('queued', 'running')
+'''
+SQL_GET_LATEST_ANALYSIS_JOB = '''
+    SELECT id, status, result_id, error
+    FROM analysis_jobs
+    WHERE audio_file_id = ? AND user_id = ?
+    ORDER BY rowid DESC
+    LIMIT 1
+'''
+
+SQL_GET_USER_STATISTICS = '''
+    SELECT
+        (SELECT COUNT(*) FROM audio_files WHERE user_id = ?),
+        (SELECT COUNT(*) FROM analysis_results WHERE user_id = ?),
+        (SELECT COUNT(*) FROM analysis_results WHERE user_id = ? AND is_ai_generated = 1),
+        (SELECT AVG(confidence_score) FROM analysis_results WHERE user_id = ?)
+'''
+
+
+def _connect():
+    """Open a connection tuned for concurrent request handling"""
+    conn = sqlite3.connect(DB_PATH, check_same_thread=False)
+    conn.execute('PRAGMA journal_mode=WAL')
+    conn.execute('PRAGMA synchronous=NORMAL')
+    conn.execute('PRAGMA temp_store=MEMORY')
+    conn.execute('PRAGMA cache_size=-64000')
+    conn.execute(f'PRAGMA mmap_size={MMAP_SIZE}')
+    return conn
+
+
+def get_db():
+    """Get the current request's connection, borrowing one from the pool on first use"""
+    if 'db' not in g:
+        try:
+            g.db = _pool.get_nowait()
+        except queue.Empty:
+            g.db = _connect()
+    return g.db
+
+
+def close_db(exception=None):
+    """Return the request's connection to the pool (registered as an app teardown)"""
+    conn = g.pop('db', None)
+    if conn is None:
+        return
+    
+    # Discard anything a failed request left uncommitted
+    conn.rollback()
+    try:
+        _pool.put_nowait(conn)
+    except queue.Full:
+        conn.close()
 
 
 @contextmanager
@@ -26,7 +171,7 @@ def get_user_by_email(email):
     """Get user by email"""
     with get_db_connection() as conn:
         cursor = conn.cursor()
-        cursor.execute('SELECT * FROM users WHERE email = ?', (email,))
+        cursor.execute(SQL_GET_USER_BY_EMAIL, (email,))
         row = cursor.fetchone()
         return dict(row) if row else None
 
@@ -35,7 +180,7 @@ def get_user_by_id(user_id):
     """Get user by ID"""
     with get_db_connection() as conn:
         cursor = conn.cursor()
-        cursor.execute('SELECT * FROM users WHERE id = ?', (user_id,))
+        cursor.execute(SQL_GET_USER_BY_ID, (user_id,))
         row = cursor.fetchone()
         return dict(row) if row else None
 
@@ -44,10 +189,7 @@ def get_audio_file(file_id, user_id):
     """Get audio file by ID and user ID"""
     with get_db_connection() as conn:
         cursor = conn.cursor()
-        cursor.execute(
-            'SELECT * FROM audio_files WHERE id = ? AND user_id = ?',
-            (file_id, user_id)
-        )
+        cursor.execute(SQL_GET_AUDIO_FILE, (file_id, user_id))
         row = cursor.fetchone()
         return dict(row) if row else None
 
@@ -56,12 +198,7 @@ def get_user_audio_files(user_id, limit=100):
     """Get all audio files for a user"""
     with get_db_connection() as conn:
         cursor = conn.cursor()
-        cursor.execute('''
-            SELECT * FROM audio_files 
-            WHERE user_id = ? 
-            ORDER BY uploaded_at DESC 
-            LIMIT ?
-        ''', (user_id, limit))
+        cursor.execute(SQL_GET_USER_AUDIO_FILES, (user_id, limit))
         rows = cursor.fetchall()
         return [dict(row) for row in rows]
 
@@ -70,17 +207,7 @@ def get_analysis_results(user_id, limit=100):
     """Get analysis results for a user"""
     with get_db_connection() as conn:
         cursor = conn.cursor()
-        cursor.execute('''
-            SELECT 
-                ar.*,
-                af.original_filename,
-                af.uploaded_at as file_uploaded_at
-            FROM analysis_results ar
-            JOIN audio_files af ON ar.audio_file_id = af.id
-            WHERE ar.user_id = ?
-            ORDER BY ar.analyzed_at DESC
-            LIMIT ?
-        ''', (user_id, limit))
+        cursor.execute(SQL_GET_ANALYSIS_RESULTS, (user_id, limit))
         rows = cursor.fetchall()
         return [dict(row) for row in rows]
 
@@ -89,15 +216,7 @@ def get_analysis_by_id(result_id, user_id):
     """Get analysis result by ID"""
     with get_db_connection() as conn:
         cursor = conn.cursor()
-        cursor.execute('''
-            SELECT 
-                ar.*,
-                af.original_filename,
-                af.file_path
-            FROM analysis_results ar
-            JOIN audio_files af ON ar.audio_file_id = af.id
-            WHERE ar.id = ? AND ar.user_id = ?
-        ''', (result_id, user_id))
+        cursor.execute(SQL_GET_ANALYSIS_BY_ID, (result_id, user_id))
         row = cursor.fetchone()
         return dict(row) if row else None
 
@@ -106,12 +225,7 @@ def save_analysis_result(audio_file_id, user_id, analysis_result):
     """Save analysis result to database"""
     with get_db_connection() as conn:
         cursor = conn.cursor()
-        cursor.execute('''
-            INSERT INTO analysis_results 
-            (audio_file_id, user_id, is_ai_generated, confidence_score, 
-             scam_patterns, analysis_details, spectral_features)
-            VALUES (?, ?, ?, ?, ?, ?, ?)
-        ''', (
+        cursor.execute(SQL_SAVE_ANALYSIS_RESULT, (
             audio_file_id,
             user_id,
             1 if analysis_result['is_ai_generated'] else 0,
@@ -128,30 +242,10 @@ def get_statistics(user_id):
     """Get user statistics"""
     with get_db_connection() as conn:
         cursor = conn.cursor()
+        cursor.row_factory = None  # plain tuple, no Row wrapper for four scalars
         
-        # Total files
-        cursor.execute('SELECT COUNT(*) as count FROM audio_files WHERE user_id = ?', (user_id,))
-        total_files = cursor.fetchone()['count']
-        
-        # Total analyses
-        cursor.execute('SELECT COUNT(*) as count FROM analysis_results WHERE user_id = ?', (user_id,))
-        total_analyses = cursor.fetchone()['count']
-        
-        # AI detected count
-        cursor.execute('''
-            SELECT COUNT(*) as count 
-            FROM analysis_results 
-            WHERE user_id = ? AND is_ai_generated = 1
-        ''', (user_id,))
-        ai_detected = cursor.fetchone()['count']
-        
-        # Average confidence
-        cursor.execute('''
-            SELECT AVG(confidence_score) as avg_confidence 
-            FROM analysis_results 
-            WHERE user_id = ?
-        ''', (user_id,))
-        avg_confidence = cursor.fetchone()['avg_confidence'] or 0
+        cursor.execute(SQL_GET_USER_STATISTICS, (user_id,) * 4)
+        total_files, total_analyses, ai_detected, avg_confidence = cursor.fetchone()
         
         return {
             'total_files': total_files,
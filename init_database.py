@@ -21,6 +21,13 @@ def init_database():
     print("Initializing VoiceShield Database...")
     print(f"Database location: {os.path.abspath(db_path)}")
     
+    # Storage layout - page_size and auto_vacuum must be set before the first
+    # table is written, so they only take effect on a new database
+    cursor.execute('PRAGMA page_size = 8192')
+    cursor.execute('PRAGMA auto_vacuum = INCREMENTAL')
+    cursor.execute('PRAGMA journal_mode = WAL')
+    cursor.execute('PRAGMA mmap_size = 268435456')  # 256MB
+    
     # Enable foreign keys
     cursor.execute('PRAGMA foreign_keys = ON')
     
@@ -50,11 +57,17 @@ def init_database():
             file_format TEXT,
             duration REAL,
             sample_rate INTEGER,
+            content_hash TEXT,
             uploaded_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
             FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
         )
     ''')
     
+    # content_hash was added after the first release; add it to existing databases
+    columns = {row[1] for row in cursor.execute('PRAGMA table_info(audio_files)')}
+    if 'content_hash' not in columns:
+        cursor.execute('ALTER TABLE audio_files ADD COLUMN content_hash TEXT')
+    
     # Analysis results table - stores voice analysis results
     print("Creating analysis_results table...")
     cursor.execute('''
@@ -73,18 +86,53 @@ def init_database():
         )
     ''')
     
+    # Analysis jobs table - tracks background analyses queued by the API
+    print("Creating analysis_jobs table...")
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS analysis_jobs (
+            id TEXT PRIMARY KEY,
+            audio_file_id INTEGER NOT NULL,
+            user_id INTEGER NOT NULL,
+            status TEXT NOT NULL DEFAULT 'queued',
+            result_id INTEGER,
+            error TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (audio_file_id) REFERENCES audio_files(id) ON DELETE CASCADE,
+            FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE,
+            FOREIGN KEY (result_id) REFERENCES analysis_results(id) ON DELETE SET NULL
+        )
+    ''')
+    
     # Create indexes for better query performance
     print("Creating indexes...")
     cursor.execute('CREATE INDEX IF NOT EXISTS idx_users_email ON users(email)')
-    cursor.execute('CREATE INDEX IF NOT EXISTS idx_audio_files_user_id ON audio_files(user_id)')
-    cursor.execute('CREATE INDEX IF NOT EXISTS idx_audio_files_uploaded_at ON audio_files(uploaded_at)')
-    cursor.execute('CREATE INDEX IF NOT EXISTS idx_analysis_results_user_id ON analysis_results(user_id)')
     cursor.execute('CREATE INDEX IF NOT EXISTS idx_analysis_results_audio_file_id ON analysis_results(audio_file_id)')
     cursor.execute('CREATE INDEX IF NOT EXISTS idx_analysis_results_analyzed_at ON analysis_results(analyzed_at)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_analysis_jobs_file ON analysis_jobs(audio_file_id, user_id)')
+    
+    # Composite indexes return a user's rows already in newest-first order, so
+    # the history and file listings need no separate sort step
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_ar_user_analyzed ON analysis_results(user_id, analyzed_at DESC)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_af_user_uploaded ON audio_files(user_id, uploaded_at DESC)')
+    
+    # Partial index over AI-detected results only (statistics and "AI only" filters)
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_ai_positive ON analysis_results(user_id, analyzed_at) WHERE is_ai_generated = 1')
+    
+    # Single-column indexes covered by the composite ones above
+    cursor.execute('DROP INDEX IF EXISTS idx_analysis_results_user_id')
+    cursor.execute('DROP INDEX IF EXISTS idx_audio_files_user_id')
+    cursor.execute('DROP INDEX IF EXISTS idx_audio_files_uploaded_at')
+    
+    # No query looks files up by content hash, so inserts should not maintain an index on it
+    cursor.execute('DROP INDEX IF EXISTS idx_af_user_hash')
     
     # Commit changes
     conn.commit()
     
+    # Refresh planner statistics so the new indexes are picked up
+    cursor.execute('ANALYZE')
+    
     # Verify tables were created
     cursor.execute("SELECT name FROM sqlite_master WHERE type='table'")
     tables = cursor.fetchall()
@@ -4,13 +4,23 @@ Run this after starting the server to test the endpoints
 """
 import requests
 import json
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
 
 BASE_URL = "http://localhost:5000/api"
+LOAD_TEST_WORKERS = 50
+
+# Shared session so every call reuses pooled keep-alive connections
+session = requests.Session()
+session.mount('http://', HTTPAdapter(pool_connections=LOAD_TEST_WORKERS, pool_maxsize=LOAD_TEST_WORKERS))
+session.mount('https://', HTTPAdapter(pool_connections=LOAD_TEST_WORKERS, pool_maxsize=LOAD_TEST_WORKERS))
 
 def test_signup():
     """Test user signup"""
     print("Testing signup...")
-    response = requests.post(f"{BASE_URL}/auth/signup", json={
+    response = session.post(f"{BASE_URL}/auth/signup", json={
         "email": "test@example.com",
         "password": "test123"
     })
@@ -21,7 +31,7 @@ def test_signup():
 def test_login():
     """Test user login"""
     print("\nTesting login...")
-    response = requests.post(f"{BASE_URL}/auth/login", json={
+    response = session.post(f"{BASE_URL}/auth/login", json={
         "email": "test@example.com",
         "password": "test123"
     })
@@ -36,19 +46,29 @@ def test_upload(token, audio_file_path):
     headers = {"Authorization": f"Bearer {token}"}
     with open(audio_file_path, 'rb') as f:
         files = {'file': f}
-        response = requests.post(f"{BASE_URL}/voice/upload", headers=headers, files=files)
+        response = session.post(f"{BASE_URL}/voice/upload", headers=headers, files=files)
     print(f"Status: {response.status_code}")
     result = response.json()
     print(f"Response: {json.dumps(result, indent=2)}")
     return result.get('file_id') if response.status_code == 201 else None
 
 def test_analyze(token, file_id):
-    """Test voice analysis"""
+    """Test voice analysis (queues the job, then polls its status)"""
     print("\nTesting voice analysis...")
     headers = {"Authorization": f"Bearer {token}"}
-    response = requests.post(f"{BASE_URL}/voice/analyze/{file_id}", headers=headers)
+    response = session.post(f"{BASE_URL}/voice/analyze/{file_id}", headers=headers)
+    print(f"Status: {response.status_code}")
+    print(f"Response: {json.dumps(response.json(), indent=2)}")
+    if response.status_code != 202:
+        return None
+    
+    while True:
+        response = session.get(f"{BASE_URL}/voice/analyze/{file_id}/status", headers=headers)
+        result = response.json()
+        if response.status_code != 200 or result.get('status') in ('completed', 'failed'):
+            break
+        time.sleep(1)
     print(f"Status: {response.status_code}")
-    result = response.json()
     print(f"Response: {json.dumps(result, indent=2)}")
     return result
 
@@ -56,12 +76,38 @@ def test_history(token):
     """Test getting analysis history"""
     print("\nTesting history...")
     headers = {"Authorization": f"Bearer {token}"}
-    response = requests.get(f"{BASE_URL}/voice/history", headers=headers)
+    response = session.get(f"{BASE_URL}/voice/history", headers=headers)
     print(f"Status: {response.status_code}")
     result = response.json()
     print(f"Response: {json.dumps(result, indent=2)}")
     return result
 
+def test_static_exposure():
+    """Check that app source and data files are not served as static files"""
+    print("\nTesting static file exposure...")
+    server_url = BASE_URL.rsplit('/api', 1)[0]
+    for path in ["/./app.py", "/./config.py", "/./database/voiceshield.db"]:
+        response = session.get(f"{server_url}{path}")
+        status = "OK" if response.status_code == 404 else "EXPOSED"
+        print(f"{path}: {response.status_code} ({status})")
+
+def run_login_load_test(total_requests=500, max_workers=LOAD_TEST_WORKERS):
+    """Fire concurrent logins through the shared session and report throughput"""
+    def login_once(_):
+        response = session.post(f"{BASE_URL}/auth/login", json={
+            "email": "test@example.com",
+            "password": "test123"
+        })
+        return response.status_code
+    
+    print(f"\nLoad testing login ({total_requests} requests, {max_workers} threads)...")
+    start = time.time()
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        statuses = list(executor.map(login_once, range(total_requests)))
+    elapsed = time.time() - start
+    print(f"Succeeded: {statuses.count(200)}/{total_requests}")
+    print(f"Elapsed: {elapsed:.2f}s ({total_requests / elapsed:.1f} req/s)")
+
 if __name__ == "__main__":
     print("VoiceShield API Test Script")
     print("=" * 50)
@@ -86,5 +132,14 @@ if __name__ == "__main__":
     # Test history
     test_history(token)
     
+    # Source and database files must not be reachable
+    test_static_exposure()
+    
+    # Optional load test: python test_api.py --load [requests]
+    if "--load" in sys.argv:
+        index = sys.argv.index("--load")
+        total = int(sys.argv[index + 1]) if len(sys.argv) > index + 1 else 500
+        run_login_load_test(total)
+    
     print("\n" + "=" * 50)
     print("Tests completed!")
@@ -3,15 +3,225 @@ Advanced AI Voice Detector Module
 Detects AI-generated voices and scam patterns in audio files using multiple detection algorithms
 """
 import os
+import itertools
+from functools import lru_cache
 import numpy as np
-import librosa
-from scipy import stats, signal
+from joblib import Memory, Parallel, delayed
 import json
 import warnings
 warnings.filterwarnings('ignore')
 
+# On-disk cache of extracted features, so re-analysing a file skips decoding and the STFT
+FEATURE_CACHE_DIR = os.environ.get('FEATURE_CACHE_DIR') or 'cache/voice_features'
+_feature_cache = Memory(FEATURE_CACHE_DIR, verbose=0)
+
+# Every upload gets its own cache entry and deleting a file does not remove it, so the cache
+# is trimmed back to FEATURE_CACHE_BYTES_LIMIT (least recently used entries first) at startup
+# and after every FEATURE_CACHE_TRIM_INTERVAL newly cached files
+FEATURE_CACHE_BYTES_LIMIT = os.environ.get('FEATURE_CACHE_BYTES_LIMIT') or '1G'
+FEATURE_CACHE_TRIM_INTERVAL = 100
+_feature_cache_misses = itertools.count(1)
+
+
+def trim_feature_cache():
+    """Evict least recently used feature cache entries beyond FEATURE_CACHE_BYTES_LIMIT"""
+    try:
+        _feature_cache.reduce_size(bytes_limit=FEATURE_CACHE_BYTES_LIMIT)
+    except Exception as e:
+        print(f"Error trimming feature cache: {str(e)}")
+
+# Extracted features of one clip, as a length-1 structured array (one record).
+# Bump FEATURE_VERSION whenever the layout or the extraction changes, to invalidate the cache.
+FEATURE_VERSION = 3
+FEATURE_DTYPE = np.dtype([
+    ('duration', 'f8'),
+    ('sample_rate', 'i4'),
+    ('spectral_centroid_mean', 'f8'),
+    ('spectral_centroid_std', 'f8'),
+    ('spectral_rolloff_mean', 'f8'),
+    ('spectral_bandwidth_mean', 'f8'),
+    ('zcr_mean', 'f8'),
+    ('zcr_std', 'f8'),
+    ('mfcc_mean', 'f8', (13,)),
+    ('mfcc_std', 'f8', (13,)),
+    ('chroma_mean', 'f8', (12,)),
+    ('spectral_contrast_mean', 'f8', (7,)),
+    ('audio_energy', 'f8'),
+    ('audio_energy_std', 'f8'),
+    ('rms_mean', 'f8'),
+    ('rms_std', 'f8'),
+    ('tempo', 'f8'),
+    ('harmonic_ratio', 'f8'),
+    ('pitch_mean', 'f8')
+])
+
+# Scam pattern entries, copied and filled in per detection rather than rebuilt as literals
+_HIGH_ENERGY_TEMPLATE = {
+    'type': 'high_energy',
+    'description': 'High audio energy detected (possible urgency tactics)',
+    'confidence': 0.0
+}
+_SHORT_DURATION_PATTERN = {
+    'type': 'short_duration',
+    'description': 'Very short call duration',
+    'confidence': 0.3
+}
+
+# librosa, scipy, numba, soundfile and soxr take a second or more to import, so they are
+# imported where first used (or by preload()) rather than when this module is imported.
+
+
+def preload():
+    """Import the audio stack, compile the numba kernel and trim the feature cache ahead of the first analysis"""
+    import librosa
+    import scipy.fft
+    import scipy.signal
+    import soundfile
+    import soxr
+    
+    # njit compiles (or loads from cache) per argument type on first call, so call the kernel
+    # once for each array type feature extraction passes it: float32 C- and Fortran-ordered
+    # spectrogram features, and float64 (spectral contrast)
+    kernel = _row_moments_kernel()
+    sample = np.zeros((2, 2), dtype=np.float32)
+    for M in (sample, np.asfortranarray(sample), sample.astype(np.float64)):
+        kernel(M)
+    
+    trim_feature_cache()
+
+
+@lru_cache(maxsize=None)
+def _row_moments_kernel():
+    """Compile (or load from numba's on-disk cache) the row moments kernel on first use"""
+    import numba
+    
+    # Serial on purpose: analyses run concurrently on the app's worker threads, and numba's
+    # parallel (workqueue/TBB) runtime is not safe to enter from several threads at once
+    @numba.njit(fastmath=True, cache=True)
+    def row_moments(M):
+        """Sum and sum of squares of each row of a 2D array, in a single pass"""
+        n_rows, n_cols = M.shape
+        sums = np.empty(n_rows)
+        sumsq = np.empty(n_rows)
+        for i in range(n_rows):
+            s = 0.0
+            q = 0.0
+            for j in range(n_cols):
+                v = float(M[i, j])
+                s += v
+                q += v * v
+            sums[i] = s
+            sumsq[i] = q
+        return sums, sumsq
+    
+    return row_moments
+
+
+def _row_moments(M):
+    """Sum and sum of squares of each row of a 2D array"""
+    return _row_moments_kernel()(M)
+
+
+def _mean_std_axis1(M):
+    """Mean and standard deviation of each row of M (np.mean/np.std along axis 1 in one sweep)"""
+    sums, sumsq = _row_moments(M)
+    n = M.shape[1]
+    mean = sums / n
+    std = np.sqrt(np.maximum(sumsq / n - mean * mean, 0.0))
+    return mean, std
+
+
+def _mean_std(M):
+    """Mean and standard deviation over every element of a 2D array in one sweep"""
+    sums, sumsq = _row_moments(M)
+    n = M.size
+    mean = sums.sum() / n
+    std = np.sqrt(max(sumsq.sum() / n - mean * mean, 0.0))
+    return mean, std
+
+
+@lru_cache(maxsize=None)
+def _fft_frequencies(sr, n_fft):
+    """Center frequency of each STFT bin (float32, computed once per configuration)"""
+    import librosa
+    return librosa.fft_frequencies(sr=sr, n_fft=n_fft).astype(np.float32)
+
+
+@lru_cache(maxsize=None)
+def _hann_window(n_fft):
+    """Periodic Hann window for the STFT (float32, built once per window size)"""
+    from scipy.signal import windows
+    return windows.hann(n_fft, sym=False).astype(np.float32)
+
+
+def _spectral_shape(magnitude, freqs, roll_percent=0.85):
+    """
+    Spectral centroid, bandwidth and rolloff of every frame from one magnitude spectrogram
+    
+    Matches librosa's spectral_centroid, spectral_bandwidth (p=2) and spectral_rolloff,
+    but shares the per-frame normalisation and the centroid between the three features.
+    
+    Args:
+        magnitude: Magnitude spectrogram, shape (n_bins, n_frames)
+        freqs: Bin center frequencies, shape (n_bins,)
+        roll_percent: Energy fraction that defines the rolloff frequency
+    
+    Returns:
+        tuple: (centroid, bandwidth, rolloff) arrays of shape (n_frames,)
+    """
+    denom = magnitude.sum(axis=0) + 1e-10
+    centroid = (freqs @ magnitude) / denom
+    
+    # Spread about the centroid, from the deviations themselves: E[f^2] - E[f]^2 cancels
+    # catastrophically in float32 on narrowband frames
+    deviation = freqs[:, None] - centroid
+    bandwidth = np.sqrt(((deviation * deviation) * magnitude).sum(axis=0) / denom)
+    
+    # Rolloff: first bin whose cumulative magnitude reaches roll_percent of the frame total.
+    # Each column of csum is sorted, so a binary search run on all frames at once needs
+    # ~log2(n_bins) vector steps instead of comparing every bin of every frame.
+    csum = np.cumsum(magnitude, axis=0)
+    n_bins, n_frames = csum.shape
+    thresh = roll_percent * csum[-1]
+    frames = np.arange(n_frames)
+    lo = np.zeros(n_frames, dtype=np.intp)
+    hi = np.full(n_frames, n_bins - 1, dtype=np.intp)
+    for _ in range(n_bins.bit_length()):
+        mid = (lo + hi) >> 1
+        below = csum[mid, frames] < thresh
+        lo = np.where(below, mid + 1, lo)
+        hi = np.where(below, hi, mid)
+    rolloff = freqs[lo]
+    
+    return centroid, bandwidth, rolloff
+
+
+@_feature_cache.cache
+def _cached_features(audio_path, mtime_ns, file_size, sample_rate, n_fft, hop_length, version):
+    """Features keyed on the file's path, mtime and size (stat info, not contents), detector settings and FEATURE_VERSION"""
+    detector = VoiceDetector(sample_rate=sample_rate, n_fft=n_fft, hop_length=hop_length)
+    features = detector._compute_features(audio_path)
+    
+    # Only cache misses add entries, so this is where the cache can outgrow its limit
+    if next(_feature_cache_misses) % FEATURE_CACHE_TRIM_INTERVAL == 0:
+        trim_feature_cache()
+    return features
+
 
 class VoiceDetector:
+    # AI indicators, the measurement level below which each starts to score, and its
+    # weight in the overall AI score
+    INDICATOR_NAMES = (
+        'spectral_regularity',
+        'temporal_regularity',
+        'naturalness',
+        'harmonic_stability',
+        'formant_consistency',
+        'prosody_analysis'
+    )
+    INDICATOR_THRESHOLDS = np.array([500, 0.01, 2.0, 10, 0.1, 0.3])
+    INDICATOR_WEIGHTS = np.array([0.25, 0.20, 0.20, 0.15, 0.10, 0.10])
+    
     def __init__(self, sample_rate=22050, n_fft=2048, hop_length=512):
         """
         Initialize the voice detector with parameters
@@ -25,6 +235,10 @@ class VoiceDetector:
         self.n_fft = n_fft
         self.hop_length = hop_length
         self.ai_detection_threshold = 0.6
+        
+        # Clips outside this duration range (seconds) are rejected before decoding
+        self.min_duration = 1.0
+        self.max_duration = 600.0
     
     def detect_ai_voice(self, audio_path):
         """
@@ -41,9 +255,26 @@ class VoiceDetector:
             if not os.path.exists(audio_path):
                 raise FileNotFoundError(f"Audio file not found: {audio_path}")
             
+            # Check the duration from the header alone, before paying for a decode and STFT
+            import soundfile as sf
+            try:
+                info = sf.info(audio_path)
+                duration = info.frames / info.samplerate
+            except RuntimeError:
+                # Formats libsndfile cannot read are checked after decoding instead
+                duration = None
+            if duration is not None and not self.min_duration <= duration <= self.max_duration:
+                return self._reject_duration(duration, info.samplerate)
+            
             # Extract audio features
             features = self._extract_features(audio_path)
             
+            # Files without a readable header only get their duration checked once decoded
+            if duration is None:
+                duration = features['duration'][0].item()
+                if not self.min_duration <= duration <= self.max_duration:
+                    return self._reject_duration(duration, features['sample_rate'][0].item())
+            
             # Analyze for AI generation
             ai_detection = self._analyze_ai_indicators(features)
             
@@ -62,8 +293,8 @@ class VoiceDetector:
                 'scam_patterns': scam_patterns,
                 'details': {
                     'spectral_features': ai_detection,
-                    'audio_duration': features.get('duration', 0),
-                    'sample_rate': features.get('sample_rate', 0)
+                    'audio_duration': features['duration'][0].item(),
+                    'sample_rate': features['sample_rate'][0].item()
                 }
             }
         
@@ -76,7 +307,113 @@ class VoiceDetector:
                 'details': {'error': str(e)}
             }
     
+    def _reject_duration(self, duration, sample_rate):
+        """
+        Result for a clip too short or too long to analyse
+        
+        Args:
+            duration: Clip duration in seconds
+            sample_rate: Native sample rate of the file
+        
+        Returns:
+            dict: Analysis result with zero confidence
+        """
+        scam_patterns = []
+        if duration < self.min_duration:
+            reason = f'Audio is shorter than the {self.min_duration:g} s minimum'
+            scam_patterns.append(_SHORT_DURATION_PATTERN.copy())
+        else:
+            reason = f'Audio is longer than the {self.max_duration:g} s maximum'
+        
+        return {
+            'is_ai_generated': False,
+            'confidence': 0.0,
+            'scam_patterns': scam_patterns,
+            'details': {
+                'skipped': reason,
+                'audio_duration': duration,
+                'sample_rate': sample_rate
+            }
+        }
+    
+    def detect_batch(self, audio_paths, n_jobs=-1):
+        """
+        Run detect_ai_voice on several files in parallel worker processes
+        
+        Args:
+            audio_paths: Iterable of audio file paths
+            n_jobs: Number of worker processes (-1 uses every CPU core)
+        
+        Returns:
+            list: One detection result per path, in input order
+        """
+        return Parallel(n_jobs=n_jobs, backend='loky')(
+            delayed(self.detect_ai_voice)(path) for path in audio_paths
+        )
+    
+    def _load_audio(self, audio_path):
+        """
+        Decode an audio file to mono float32 at the detector's sample rate
+        
+        Args:
+            audio_path: Path to audio file
+        
+        Returns:
+            tuple: (samples, sample_rate)
+        """
+        import soundfile as sf
+        import soxr
+        
+        try:
+            y, sr_native = sf.read(audio_path, dtype='float32', always_2d=False)
+        except RuntimeError:
+            # Formats libsndfile cannot decode (e.g. m4a) go through librosa's audioread fallback
+            import librosa
+            return librosa.load(audio_path, sr=self.sample_rate, duration=None)
+        
+        if y.ndim == 2:
+            y = y.mean(axis=1)
+        if sr_native != self.sample_rate:
+            y = soxr.resample(y, sr_native, self.sample_rate, quality='HQ')
+        return y, self.sample_rate
+    
+    def _stft(self, y):
+        """
+        Centered short-time Fourier transform, equivalent to librosa.stft with its defaults
+        
+        Args:
+            y: Mono float32 signal
+        
+        Returns:
+            np.ndarray: Complex64 spectrogram, shape (1 + n_fft // 2, n_frames)
+        """
+        import librosa
+        from scipy import fft as scipy_fft
+        
+        # Zero-pad by half a window on each side so frame t is centered on sample t * hop_length
+        y = np.pad(y, self.n_fft // 2)
+        frames = librosa.util.frame(y, frame_length=self.n_fft, hop_length=self.hop_length)
+        window = _hann_window(self.n_fft)
+        # Single-threaded: analyses already run in parallel on the app's worker pool
+        return scipy_fft.rfft(frames * window[:, None], axis=0, workers=1)
+    
     def _extract_features(self, audio_path):
+        """
+        Extract audio features, reusing cached results for an unchanged file
+        
+        Args:
+            audio_path: Path to audio file
+        
+        Returns:
+            np.ndarray: Extracted audio features, a FEATURE_DTYPE record
+        """
+        st = os.stat(audio_path)
+        return _cached_features(
+            audio_path, st.st_mtime_ns, st.st_size,
+            self.sample_rate, self.n_fft, self.hop_length, FEATURE_VERSION
+        )
+    
+    def _compute_features(self, audio_path):
         """
         Extract comprehensive audio features for analysis
         
@@ -84,82 +421,92 @@ class VoiceDetector:
             audio_path: Path to audio file
         
         Returns:
-            dict: Extracted audio features
+            np.ndarray: Extracted audio features, a FEATURE_DTYPE record
         """
+        import librosa
+        
         try:
             # Load audio file
-            y, sr = librosa.load(audio_path, sr=self.sample_rate, duration=None)
+            y, sr = self._load_audio(audio_path)
+            # Keep the whole chain in single precision: a contiguous float32 signal and a
+            # complex64 STFT, so magnitude/power and every feature matrix stay float32
+            y = np.ascontiguousarray(y, dtype=np.float32)
             
             # Basic audio properties
             duration = len(y) / sr
             
-            # Spectral features
-            stft = librosa.stft(y, n_fft=self.n_fft, hop_length=self.hop_length)
-            magnitude = np.abs(stft)
-            power = magnitude ** 2
+            # Spectral features (one STFT, shared by every spectral feature below)
+            stft = self._stft(y)
+            # |z|^2 straight from the real/imaginary parts, then one sqrt for the magnitude
+            power = stft.real * stft.real
+            power += stft.imag * stft.imag
+            magnitude = np.sqrt(power)
             
-            # Spectral centroid (brightness/timbre)
-            spectral_centroids = librosa.feature.spectral_centroid(y=y, sr=sr)[0]
-            
-            # Spectral rolloff (high-frequency content)
-            spectral_rolloff = librosa.feature.spectral_rolloff(y=y, sr=sr)[0]
-            
-            # Spectral bandwidth (timbre width)
-            spectral_bandwidth = librosa.feature.spectral_bandwidth(y=y, sr=sr)[0]
+            # Spectral centroid (brightness/timbre), bandwidth (timbre width)
+            # and rolloff (high-frequency content) in one sweep
+            spectral_centroids, spectral_bandwidth, spectral_rolloff = _spectral_shape(
+                magnitude, _fft_frequencies(sr, self.n_fft)
+            )
             
             # Zero crossing rate (noisiness/periodicity)
             zcr = librosa.feature.zero_crossing_rate(y)[0]
             
             # MFCC (Mel-frequency cepstral coefficients) - voice characteristics
-            mfccs = librosa.feature.mfcc(y=y, sr=sr, n_mfcc=13)
+            melspec = librosa.feature.melspectrogram(S=power, sr=sr)
+            mfccs = librosa.feature.mfcc(S=librosa.power_to_db(melspec), n_mfcc=13)
             
             # Chroma features (pitch class)
             chroma = librosa.feature.chroma_stft(S=power, sr=sr)
             
             # Spectral contrast (harmonic vs noise)
-            spectral_contrast = librosa.feature.spectral_contrast(y=y, sr=sr)
+            spectral_contrast = librosa.feature.spectral_contrast(
+                S=magnitude, sr=sr, n_fft=self.n_fft, hop_length=self.hop_length
+            )
             
-            # Tempo and rhythm (if applicable)
-            try:
-                tempo, _ = librosa.beat.beat_track(y=y, sr=sr)
-            except:
-                tempo = 0
+            # Tempo is not used by any indicator, so the beat tracker is not run. If it is
+            # needed, librosa.feature.tempo on onset_strength(S=...) reuses the spectrogram.
+            tempo = 0.0
             
-            # Harmonic and percussive separation
-            y_harmonic, y_percussive = librosa.effects.hpss(y)
-            harmonic_ratio = np.mean(np.abs(y_harmonic)) / (np.mean(np.abs(y_harmonic)) + np.mean(np.abs(y_percussive)) + 1e-10)
+            # Harmonic ratio, approximated by the low-band share of spectral energy
+            harmonic_ratio = np.sum(magnitude[:magnitude.shape[0] // 4]) / (np.sum(magnitude) + 1e-10)
             
-            # Pitch tracking (fundamental frequency)
+            # Pitch tracking (fundamental frequency, YIN in the time domain)
             try:
-                pitches, magnitudes = librosa.piptrack(y=y, sr=sr)
-                pitch_mean = np.mean(pitches[pitches > 0]) if np.any(pitches > 0) else 0
+                f0 = librosa.yin(y, fmin=50, fmax=500, sr=sr, frame_length=self.n_fft)
+                pitch_mean = np.nanmean(f0) if np.any(np.isfinite(f0)) else 0
             except:
                 pitch_mean = 0
             
             # RMS energy (loudness)
             rms = librosa.feature.rms(y=y)[0]
             
-            return {
-                'duration': float(duration),
-                'sample_rate': int(sr),
-                'spectral_centroid_mean': float(np.mean(spectral_centroids)),
-                'spectral_centroid_std': float(np.std(spectral_centroids)),
-                'spectral_rolloff_mean': float(np.mean(spectral_rolloff)),
-                'spectral_bandwidth_mean': float(np.mean(spectral_bandwidth)),
-                'zcr_mean': float(np.mean(zcr)),
-                'zcr_std': float(np.std(zcr)),
-                'mfcc_mean': [float(x) for x in np.mean(mfccs, axis=1)],
-                'mfcc_std': [float(x) for x in np.std(mfccs, axis=1)],
-                'chroma_mean': [float(x) for x in np.mean(chroma, axis=1)],
-                'spectral_contrast_mean': [float(x) for x in np.mean(spectral_contrast, axis=1)],
-                'audio_energy': float(np.mean(power)),
-                'audio_energy_std': float(np.std(power)),
-                'rms_mean': float(np.mean(rms)),
-                'rms_std': float(np.std(rms)),
-                'tempo': float(tempo),
-                'harmonic_ratio': float(harmonic_ratio),
-                'pitch_mean': float(pitch_mean)
-            }
+            # Summary statistics, one pass per spectrogram-sized array
+            mfcc_mean, mfcc_std = _mean_std_axis1(mfccs)
+            chroma_mean, _ = _mean_std_axis1(chroma)
+            spectral_contrast_mean, _ = _mean_std_axis1(spectral_contrast)
+            audio_energy, audio_energy_std = _mean_std(power)
+            
+            features = np.zeros(1, dtype=FEATURE_DTYPE)
+            features['duration'] = duration
+            features['sample_rate'] = sr
+            features['spectral_centroid_mean'] = spectral_centroids.mean()
+            features['spectral_centroid_std'] = spectral_centroids.std()
+            features['spectral_rolloff_mean'] = spectral_rolloff.mean()
+            features['spectral_bandwidth_mean'] = spectral_bandwidth.mean()
+            features['zcr_mean'] = zcr.mean()
+            features['zcr_std'] = zcr.std()
+            features['mfcc_mean'] = mfcc_mean
+            features['mfcc_std'] = mfcc_std
+            features['chroma_mean'] = chroma_mean
+            features['spectral_contrast_mean'] = spectral_contrast_mean
+            features['audio_energy'] = audio_energy
+            features['audio_energy_std'] = audio_energy_std
+            features['rms_mean'] = rms.mean()
+            features['rms_std'] = rms.std()
+            features['tempo'] = tempo
+            features['harmonic_ratio'] = harmonic_ratio
+            features['pitch_mean'] = pitch_mean
+            return features
         
         except Exception as e:
             raise Exception(f"Feature extraction failed: {str(e)}")
@@ -169,77 +516,42 @@ class VoiceDetector:
         Advanced analysis for AI generation indicators using multiple algorithms
         
         Args:
-            features: Dictionary of audio features
+            features: Audio features (FEATURE_DTYPE record)
         
         Returns:
             dict: AI detection indicators and scores
         """
-        ai_scores = {
-            'spectral_regularity': 0.0,
-            'temporal_regularity': 0.0,
-            'naturalness': 0.0,
-            'harmonic_stability': 0.0,
-            'formant_consistency': 0.0,
-            'prosody_analysis': 0.0,
-            'overall_ai_score': 0.0
-        }
+        ai_scores = dict.fromkeys(self.INDICATOR_NAMES, 0.0)
+        ai_scores['overall_ai_score'] = 0.0
         
         try:
-            # 1. Spectral Regularity Analysis
-            # AI-generated voices often have more regular spectral patterns
-            spectral_centroid_std = features.get('spectral_centroid_std', 0)
-            if spectral_centroid_std < 500:  # Threshold for regularity
-                ai_scores['spectral_regularity'] = min(1.0, (500 - spectral_centroid_std) / 500)
-            
-            # 2. Temporal Regularity Analysis
-            # AI voices may have less variation in zero crossing rate
-            zcr_std = features.get('zcr_std', 0)
-            if zcr_std < 0.01:
-                ai_scores['temporal_regularity'] = min(1.0, (0.01 - zcr_std) / 0.01)
-            
-            # 3. Naturalness Analysis (MFCC consistency)
-            # Human voices have more variation in MFCC coefficients
-            mfcc_std = features.get('mfcc_std', [])
-            if mfcc_std:
-                avg_mfcc_std = np.mean(mfcc_std)
-                if avg_mfcc_std < 2.0:  # Lower variation might indicate AI
-                    ai_scores['naturalness'] = min(1.0, (2.0 - avg_mfcc_std) / 2.0)
+            # One measurement per indicator, all "lower means more regular (possibly AI)".
+            # A measurement that cannot be taken is +inf, which scores 0 below.
+            spectral_centroid_mean = features['spectral_centroid_mean'][0]
+            spectral_centroid_std = features['spectral_centroid_std'][0]
+            audio_energy = features['audio_energy'][0]
+            measurements = np.array([
+                # 1. Spectral regularity: AI voices often have more regular spectral patterns
+                spectral_centroid_std,
+                # 2. Temporal regularity: less variation in zero crossing rate
+                features['zcr_std'][0],
+                # 3. Naturalness: human voices vary more across MFCC coefficients
+                features['mfcc_std'][0].mean(),
+                # 4. Harmonic stability: low spectral contrast variance means stable harmonics
+                features['spectral_contrast_mean'][0].var(),
+                # 5. Formant consistency: coefficient of variation of the spectral centroid
+                spectral_centroid_std / spectral_centroid_mean if spectral_centroid_mean > 0 else np.inf,
+                # 6. Prosody: human speech has more natural energy variation
+                features['audio_energy_std'][0] / audio_energy if audio_energy > 0 else np.inf
+            ], dtype=np.float64)
             
-            # 4. Harmonic Stability Analysis
-            # AI voices may have more stable harmonics
-            spectral_contrast = features.get('spectral_contrast_mean', [])
-            if spectral_contrast:
-                contrast_variance = np.var(spectral_contrast)
-                if contrast_variance < 10:  # Low variance indicates stability (possible AI)
-                    ai_scores['harmonic_stability'] = min(1.0, (10 - contrast_variance) / 10)
+            # Each indicator rises linearly from 0 at its threshold to 1 at zero
+            thresholds = self.INDICATOR_THRESHOLDS
+            scores = np.clip((thresholds - measurements) / thresholds, 0.0, 1.0)
             
-            # 5. Formant Consistency (using spectral centroid)
-            # Human voices have more formant variation
-            spectral_centroid_mean = features.get('spectral_centroid_mean', 0)
-            spectral_centroid_std = features.get('spectral_centroid_std', 0)
-            if spectral_centroid_mean > 0:
-                coefficient_of_variation = spectral_centroid_std / spectral_centroid_mean
-                if coefficient_of_variation < 0.1:  # Low CV indicates consistency (possible AI)
-                    ai_scores['formant_consistency'] = min(1.0, (0.1 - coefficient_of_variation) / 0.1)
-            
-            # 6. Prosody Analysis (using energy variation)
-            # Human speech has more natural energy variations
-            audio_energy_std = features.get('audio_energy_std', 0)
-            audio_energy = features.get('audio_energy', 0)
-            if audio_energy > 0:
-                energy_cv = audio_energy_std / audio_energy
-                if energy_cv < 0.3:  # Low energy variation might indicate AI
-                    ai_scores['prosody_analysis'] = min(1.0, (0.3 - energy_cv) / 0.3)
-            
-            # Calculate overall AI score (weighted average of all indicators)
-            ai_scores['overall_ai_score'] = (
-                ai_scores['spectral_regularity'] * 0.25 +
-                ai_scores['temporal_regularity'] * 0.20 +
-                ai_scores['naturalness'] * 0.20 +
-                ai_scores['harmonic_stability'] * 0.15 +
-                ai_scores['formant_consistency'] * 0.10 +
-                ai_scores['prosody_analysis'] * 0.10
-            )
+            ai_scores.update(zip(self.INDICATOR_NAMES, scores.tolist()))
+            # Overall AI score: weighted average of all indicators
+            ai_scores['overall_ai_score'] = float(scores @ self.INDICATOR_WEIGHTS)
             
         except Exception as e:
             print(f"Error in AI analysis: {str(e)}")
@@ -252,7 +564,7 @@ class VoiceDetector:
         Note: Full scam detection would require transcription and NLP
         
         Args:
-            features: Dictionary of audio features
+            features: Audio features (FEATURE_DTYPE record)
         
         Returns:
             list: Detected scam patterns
@@ -261,23 +573,17 @@ class VoiceDetector:
         
         try:
             # Detect high energy/urgency (potential urgency tactics)
-            audio_energy = features.get('audio_energy', 0)
+            audio_energy = features['audio_energy'][0].item()
             if audio_energy > 0.1:  # Threshold for high energy
-                patterns.append({
-                    'type': 'high_energy',
-                    'description': 'High audio energy detected (possible urgency tactics)',
-                    'confidence': min(1.0, audio_energy * 10)
-                })
+                pattern = _HIGH_ENERGY_TEMPLATE.copy()
+                pattern['confidence'] = min(1.0, audio_energy * 10)
+                patterns.append(pattern)
             
             # Detect rapid speech (potential pressure tactics)
             # This is a simplified check; full analysis would require speech rate calculation
-            duration = features.get('duration', 0)
+            duration = features['duration'][0]
             if duration > 0 and duration < 30:  # Very short calls might be suspicious
-                patterns.append({
-                    'type': 'short_duration',
-                    'description': 'Very short call duration',
-                    'confidence': 0.3
-                })
+                patterns.append(_SHORT_DURATION_PATTERN.copy())
             
             # Note: Real scam pattern detection would require:
             # 1. Speech-to-text transcription
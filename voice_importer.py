@@ -3,16 +3,49 @@ Voice Importer Module
 Handles audio file imports, validation, and storage
 """
 import os
+import hashlib
 import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from werkzeug.utils import secure_filename
 from datetime import datetime
-import uuid
+import secrets
+
+
+DB_PATH = 'database/voiceshield.db'
+UPLOAD_CHUNK_SIZE = 1 << 20
+IO_WORKERS = 8
+
+SQL_INSERT_AUDIO_FILE = '''
+    INSERT INTO audio_files (user_id, filename, original_filename, file_path, file_size, content_hash)
+    VALUES (?, ?, ?, ?, ?, ?)
+'''
 
 
 class VoiceImporter:
     def __init__(self, upload_folder):
         self.upload_folder = upload_folder
         os.makedirs(upload_folder, exist_ok=True)
+        
+        # One connection shared by every import/delete, opened on first use
+        self._conn = None
+        self._db_lock = threading.Lock()
+        
+        # Threads that write batch uploads to disk (started on demand by the executor)
+        self._io_executor = ThreadPoolExecutor(max_workers=IO_WORKERS, thread_name_prefix='voice-import')
+    
+    def _get_connection(self):
+        """
+        Return the shared database connection, opening it on first use
+        
+        Must be called with self._db_lock held.
+        """
+        if self._conn is None:
+            conn = sqlite3.connect(DB_PATH, check_same_thread=False, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._conn = conn
+        return self._conn
     
     def import_audio(self, file, user_id):
         """
@@ -30,55 +63,119 @@ class VoiceImporter:
             if not file:
                 return {'success': False, 'error': 'No file provided'}
             
-            # Get file info
-            original_filename = secure_filename(file.filename)
-            file_ext = original_filename.rsplit('.', 1)[1].lower() if '.' in original_filename else ''
-            
-            # Generate unique filename
-            unique_id = str(uuid.uuid4())
-            safe_filename = f"{unique_id}.{file_ext}"
-            
-            # Create user-specific directory
-            user_folder = os.path.join(self.upload_folder, str(user_id))
-            os.makedirs(user_folder, exist_ok=True)
-            
-            # Save file
-            file_path = os.path.join(str(user_id), safe_filename)
-            full_path = os.path.join(self.upload_folder, file_path)
-            file.save(full_path)
+            saved = self._save_file(file, user_id)
             
-            # Get file size
-            file_size = os.path.getsize(full_path)
+            # Store file metadata in database (autocommit on the shared connection)
+            with self._db_lock:
+                cursor = self._get_connection().execute(SQL_INSERT_AUDIO_FILE, (
+                    user_id, saved['filename'], saved['original_filename'],
+                    saved['file_path'], saved['file_size'], saved['content_hash']
+                ))
+                file_id = cursor.lastrowid
             
-            # Validate file was saved
-            if not os.path.exists(full_path):
-                return {'success': False, 'error': 'Failed to save file'}
-            
-            # Store file metadata in database
-            conn = sqlite3.connect('database/voiceshield.db')
-            cursor = conn.cursor()
-            
-            cursor.execute('''
-                INSERT INTO audio_files (user_id, filename, original_filename, file_path, file_size)
-                VALUES (?, ?, ?, ?, ?)
-            ''', (user_id, safe_filename, original_filename, file_path, file_size))
-            
-            file_id = cursor.lastrowid
-            conn.commit()
-            conn.close()
-            
-            return {
-                'success': True,
-                'file_id': file_id,
-                'filename': safe_filename,
-                'original_filename': original_filename,
-                'file_path': file_path,
-                'file_size': file_size
-            }
+            return {'success': True, 'file_id': file_id, **saved}
         
         except Exception as e:
             return {'success': False, 'error': str(e)}
     
+    def import_audio_batch(self, files, user_id):
+        """
+        Import and save several audio files, recording them in a single transaction
+        
+        Args:
+            files: List of Flask file objects
+            user_id: ID of the user uploading the files
+        
+        Returns:
+            dict: Result with success status, the imported files and per-file errors
+        """
+        try:
+            # Write the files concurrently; a file that fails to save is reported, not fatal
+            def save(file):
+                try:
+                    return self._save_file(file, user_id), None
+                except Exception as e:
+                    return None, {'original_filename': getattr(file, 'filename', None), 'error': str(e)}
+            
+            outcomes = list(self._io_executor.map(save, [file for file in files if file]))
+            saved_files = [saved for saved, _ in outcomes if saved]
+            errors = [error for _, error in outcomes if error]
+            if not saved_files:
+                return {'success': False, 'error': 'No files could be saved', 'errors': errors}
+            
+            with self._db_lock:
+                conn = self._get_connection()
+                conn.execute('BEGIN')
+                try:
+                    # Row by row inside one transaction: still a single commit, and each
+                    # insert's lastrowid gives that file's id
+                    imported = []
+                    for saved in saved_files:
+                        cursor = conn.execute(SQL_INSERT_AUDIO_FILE, (
+                            user_id, saved['filename'], saved['original_filename'],
+                            saved['file_path'], saved['file_size'], saved['content_hash']
+                        ))
+                        imported.append({'file_id': cursor.lastrowid, **saved})
+                    conn.execute('COMMIT')
+                except Exception:
+                    conn.execute('ROLLBACK')
+                    # No rows refer to the written files any more
+                    for saved in saved_files:
+                        try:
+                            os.remove(os.path.join(self.upload_folder, saved['file_path']))
+                        except FileNotFoundError:
+                            pass
+                    raise
+            
+            return {'success': True, 'files': imported, 'errors': errors}
+        
+        except Exception as e:
+            return {'success': False, 'error': str(e)}
+    
+    def _save_file(self, file, user_id):
+        """
+        Write an uploaded file to the user's upload folder under a unique name
+        
+        Args:
+            file: Flask file object
+            user_id: ID of the user uploading the file
+        
+        Returns:
+            dict: filename, original_filename, file_path, file_size and content_hash
+        """
+        # Get file info
+        original_filename = secure_filename(file.filename)
+        file_ext = original_filename.rsplit('.', 1)[1].lower() if '.' in original_filename else ''
+        
+        # Generate unique filename
+        unique_id = secrets.token_hex(8)
+        safe_filename = f"{unique_id}.{file_ext}"
+        
+        # Create user-specific directory
+        user_folder = os.path.join(self.upload_folder, str(user_id))
+        os.makedirs(user_folder, exist_ok=True)
+        
+        # Save file
+        file_path = os.path.join(str(user_id), safe_filename)
+        full_path = os.path.join(self.upload_folder, file_path)
+        # Stream the upload to disk, counting its size and hashing its content on the way
+        # (a failed write raises, so the file needs no stat afterwards)
+        content_hash = hashlib.blake2b(digest_size=16)
+        file_size = 0
+        with open(full_path, 'wb') as out:
+            while chunk := file.stream.read(UPLOAD_CHUNK_SIZE):
+                out.write(chunk)
+                content_hash.update(chunk)
+                file_size += len(chunk)
+        
+        return {
+            'filename': safe_filename,
+            'original_filename': original_filename,
+            'file_path': file_path,
+            'file_size': file_size,
+            'content_hash': content_hash.hexdigest()
+        }
+    
     def validate_audio_file(self, file_path):
         """
         Validate that the file is a valid audio file
@@ -90,10 +187,12 @@ class VoiceImporter:
             dict: Validation result with success status and details
         """
         try:
-            if not os.path.exists(file_path):
+            # One stat() answers both "does it exist" and "how big is it"
+            try:
+                file_size = os.stat(file_path).st_size
+            except FileNotFoundError:
                 return {'valid': False, 'error': 'File does not exist'}
             
-            file_size = os.path.getsize(file_path)
             if file_size == 0:
                 return {'valid': False, 'error': 'File is empty'}
             
@@ -115,31 +214,29 @@ class VoiceImporter:
             dict: Result with success status
         """
         try:
-            conn = sqlite3.connect('database/voiceshield.db')
-            cursor = conn.cursor()
-            
-            # Get file info
-            cursor.execute(
-                'SELECT file_path FROM audio_files WHERE id = ? AND user_id = ?',
-                (file_id, user_id)
-            )
-            file_record = cursor.fetchone()
-            
-            if not file_record:
-                conn.close()
-                return {'success': False, 'error': 'File not found'}
-            
-            file_path = file_record[0]
-            full_path = os.path.join(self.upload_folder, file_path)
-            
-            # Delete file from filesystem
-            if os.path.exists(full_path):
-                os.remove(full_path)
-            
-            # Delete from database
-            cursor.execute('DELETE FROM audio_files WHERE id = ? AND user_id = ?', (file_id, user_id))
-            conn.commit()
-            conn.close()
+            with self._db_lock:
+                conn = self._get_connection()
+                
+                # Get file info
+                file_record = conn.execute(
+                    'SELECT file_path FROM audio_files WHERE id = ? AND user_id = ?',
+                    (file_id, user_id)
+                ).fetchone()
+                
+                if not file_record:
+                    return {'success': False, 'error': 'File not found'}
+                
+                file_path = file_record[0]
+                full_path = os.path.join(self.upload_folder, file_path)
+                
+                # Delete file from filesystem (it may already be gone)
+                try:
+                    os.remove(full_path)
+                except FileNotFoundError:
+                    pass
+                
+                # Delete from database
+                conn.execute('DELETE FROM audio_files WHERE id = ? AND user_id = ?', (file_id, user_id))
             
             return {'success': True}
         